@@ -1,8 +1,68 @@
+import bisect
+import io
 import numpy as np
-import matplotlib.pyplot as plt
 import streamlit as st
-import pandas as pd
-import random
+import requests
+
+
+@st.cache_data(show_spinner=False)
+def make_data(n=300, seed=7):
+    """
+    Genera datos simulados (mezcla de dos normales) recortados a [0, 100].
+    """
+    rng = np.random.default_rng(seed)
+    out = np.empty(n, dtype=np.float64)
+    k = int(n * 0.7)
+    # Se llena el mismo buffer por tramos: N(62, 12) y luego N(78, 8)
+    part1, part2 = out[:k], out[k:]
+    rng.standard_normal(out=part1)
+    part1 *= 12
+    part1 += 62
+    rng.standard_normal(out=part2)
+    part2 *= 8
+    part2 += 78
+    return np.clip(out, 0, 100, out=out)
+
+
+# Mismos marcadores de dato ausente que pd.read_csv reconoce por defecto
+NA_VALUES = frozenset({
+    "", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan", "1.#IND",
+    "1.#QNAN", "<NA>", "N/A", "NA", "NULL", "NaN", "None", "n/a", "nan", "null",
+})
+
+
+@st.cache_resource
+def http_session():
+    """
+    Sesión HTTP compartida para reutilizar la conexión (keep-alive) entre reruns.
+    """
+    return requests.Session()
+
+
+@st.cache_data(ttl=3600, show_spinner=False)
+def fetch_sheet_values(sheet_id):
+    """
+    Descarga la primera columna de un Google Sheet público como float64.
+    El resultado se guarda en caché (1 h) para no descargar la hoja en cada rerun.
+    Ante cualquier fallo lanza una excepción, que st.cache_data no guarda:
+    el siguiente rerun vuelve a intentar la descarga.
+    """
+    url = f"https://docs.google.com/spreadsheets/d/{sheet_id}/export?format=csv"
+    resp = http_session().get(url, timeout=5)
+    resp.raise_for_status()
+    if not resp.text.strip():
+        raise ValueError("La hoja está vacía")
+    # Solo la primera columna, directo a float64. Las celdas vacías o con los
+    # marcadores de ausencia de pandas quedan como NaN; sin comentarios, para
+    # que errores de la hoja como #DIV/0! o #REF! fallen como antes.
+    values = np.loadtxt(
+        io.StringIO(resp.text), delimiter=",", usecols=0, ndmin=1, quotechar='"',
+        comments=None, converters=lambda s: np.nan if s in NA_VALUES else float(s),
+    )
+    values = values[~np.isnan(values)]  # descartar celdas vacías
+    if len(values) == 0:
+        raise ValueError("La hoja está vacía")
+    return values
 
 
 def get_data_from_sheet_or_simulated(sheet_id, default_seed=7, n=300):
@@ -10,74 +70,138 @@ def get_data_from_sheet_or_simulated(sheet_id, default_seed=7, n=300):
     Intenta leer datos directamente de un Google Sheet público.
     Si falla, genera datos simulados con una semilla por defecto.
     """
-    url = f"https://docs.google.com/spreadsheets/d/{sheet_id}/export?format=csv"
     try:
-        df = pd.read_csv(url, header=None)  # sin cabeceras
-        values = df[0].dropna().astype(float).to_numpy()  # usar primera columna
-        if len(values) == 0:
-            raise ValueError("La hoja está vacía")
-        return values, True
+        return fetch_sheet_values(sheet_id), True
     except Exception as e:
-        rng = np.random.default_rng(default_seed)
-        part1 = rng.normal(62, 12, int(n * 0.7))
-        part2 = rng.normal(78, 8, n - len(part1))
-        fallback = np.clip(np.concatenate([part1, part2]), 0, 100)
+        fallback = make_data(n=n, seed=default_seed)
         print(f"[WARN] No se pudo leer Google Sheets: {e}. Usando datos simulados.")
         return fallback, False
 
 
 
 def ogive(values, bins=10):
-    counts, edges = np.histogram(values, bins=bins, range=(values.min(), values.max()))
+    counts, edges = np.histogram(values, bins=bins)
     cum_counts = counts.cumsum()
-    cum_pct = 100 * cum_counts / cum_counts[-1]
-    x_plot = np.r_[edges[0], edges[1:]]
-    y_plot = np.r_[0, cum_pct]
-    return x_plot, y_plot, edges, counts
+    # La ogiva arranca en 0 % sobre el primer borde: x coincide con los bordes
+    y_plot = np.empty(len(edges))
+    y_plot[0] = 0.0
+    np.multiply(cum_counts, 100, out=y_plot[1:])
+    y_plot[1:] /= cum_counts[-1]
+    return edges, y_plot, counts, cum_counts
 
 
-def frequency_table(values, edges, counts):
+def frequency_table(edges, counts, cum_freq):
     """
-    Calcula la tabla de frecuencias a partir de los bordes e histogramas.
+    Calcula la tabla de frecuencias a partir de los bordes, el histograma y sus
+    frecuencias acumuladas (las mismas que usa la ogiva).
     Devuelve un DataFrame con intervalos, frecuencia, frecuencia relativa y acumulada.
     """
-    rel_freq = counts / counts.sum() * 100
-    cum_freq = counts.cumsum()
-    pct = rel_freq.round(2)
-    pct_acum = cum_freq / counts.sum() * 100
+    import pandas as pd  # importación diferida: pandas es costoso de cargar en frío
+
+    total = cum_freq[-1]
+    pct = (counts / total * 100).round(2)
+    pct_acum = (cum_freq / total * 100).round(2)
     # Intervalos en notación estándar: [a, b) excepto el último [a, b]
-    intervalos = [f"[{li:.2f}, {ls:.2f})" for li, ls in zip(edges[:-1], edges[1:])]
-    if intervalos:
-        intervalos[-1] = intervalos[-1][:-1] + "]"
+    # Cada borde se formatea una sola vez y se comparte entre intervalos vecinos
+    bordes = [f"{e:.2f}" for e in edges]
+    cierres = [")"] * (len(bordes) - 2) + ["]"]
+    intervalos = [f"[{li}, {ls}{c}" for li, ls, c in zip(bordes[:-1], bordes[1:], cierres)]
     freq_table = pd.DataFrame({
         "Intervalo": intervalos,
         "Frecuencia": counts,
         "Frecuencia relativa (%)": pct,
         "Frecuencia acumulada": cum_freq,
         "% del total": pct,
-        "% acumulado": pct_acum.round(2)
+        "% acumulado": pct_acum
     })
     return freq_table
 
 
+def interp_scalar(value, xp, fp):
+    """
+    Interpolación lineal de un solo punto, equivalente a np.interp para xp
+    no decreciente, pero sin convertir los argumentos a ndarray.
+    """
+    i = bisect.bisect_right(xp, value)
+    if i == 0:
+        return fp[0]
+    if i >= len(xp):
+        return fp[-1]
+    x0, x1 = xp[i - 1], xp[i]
+    y0, y1 = fp[i - 1], fp[i]
+    return y0 + (value - x0) / (x1 - x0) * (y1 - y0)
+
+
 def interp_percentile_at(value, x_plot, y_plot):
-    return float(np.interp(value, x_plot, y_plot))
+    return float(interp_scalar(value, x_plot.tolist(), y_plot.tolist()))
 
 
 def interp_value_at(percentile, x_plot, y_plot):
-    return float(np.interp(percentile, y_plot, x_plot))
+    return float(interp_scalar(percentile, y_plot.tolist(), x_plot.tolist()))
+
+
+
+def ogive_inverse(x_plot, y_plot):
+    """
+    Calcula la ogiva mayor-que (inversa) a partir de la ogiva menor-que.
+    Sobre los mismos bordes, el % mayor-que es el complemento del % menor-que.
+    """
+    return x_plot, 100.0 - y_plot
+
 
+@st.cache_data(show_spinner=False)
+def ogive_summary(values, bins=10):
+    """
+    Agrupa los cálculos que dependen solo de (datos, bins): ogiva, tabla de
+    frecuencias, cuartiles y el valor de la ogiva en el percentil 75. Se guarda
+    en caché para que los reruns que no cambian datos ni bins no repitan el
+    histograma, la tabla ni la interpolación.
+    """
+    # La x de la ogiva son los propios bordes del histograma
+    x_plot, y_plot, counts, cum_counts = ogive(values, bins=bins)
+    freq_table = frequency_table(x_plot, counts, cum_counts)
+    quartiles = np.percentile(values, [25, 50, 75])
+    top_quartile_cut = interp_value_at(75, x_plot, y_plot)
+    return x_plot, y_plot, freq_table, quartiles, top_quartile_cut
 
 
-def ogive_inverse(counts, edges):
+def ogive_chart(x, y, quartiles, y_vals, title, color, legend_orient):
     """
-    Calcula la ogiva mayor-que (inversa) a partir de los histogramas y bordes.
+    Construye con Altair la gráfica de una ogiva con las guías y puntos de sus
+    cuartiles. Se envía al navegador como especificación Vega-Lite (JSON) y se
+    dibuja en el cliente, sin rasterizar en el servidor.
     """
-    rev_cum = counts[::-1].cumsum()[::-1]
-    y_gt_core = 100 * rev_cum / rev_cum[0]
-    x_gt = np.r_[edges[:-1], edges[-1]]
-    y_gt = np.r_[y_gt_core, 0]
-    return x_gt, y_gt
+    import altair as alt  # importación diferida: solo se necesita aquí
+    import pandas as pd
+
+    labels = [f"{label} ({p:.1f})" for label, p in zip(["Q1", "Q2", "Q3"], quartiles)]
+    curve = pd.DataFrame({"Valor": x, "Porcentaje": y})
+    marks = pd.DataFrame({
+        "Cuartil": labels,
+        "Valor": quartiles,
+        "Porcentaje": y_vals,
+        "Base": 0.0,
+        "Inicio": x[0],
+    })
+    # Mismos dominios en ambas gráficas para que sean comparables
+    x_enc = alt.X("Valor:Q", title="Valor", scale=alt.Scale(domain=[x[0], x[-1]]))
+    y_enc = alt.Y("Porcentaje:Q", title="Frecuencia acumulada (%)", scale=alt.Scale(domain=[0, 100]))
+    color_enc = alt.Color(
+        "Cuartil:N",
+        scale=alt.Scale(domain=labels, range=["red", "green", "purple"]),
+        legend=alt.Legend(title=None, orient=legend_orient),
+    )
+
+    line = alt.Chart(curve).mark_line(point=True, color=color, strokeWidth=2).encode(
+        x=x_enc, y=y_enc, tooltip=["Valor:Q", "Porcentaje:Q"]
+    )
+    guides = alt.Chart(marks).mark_rule(strokeDash=[4, 4], opacity=0.7)
+    vguides = guides.encode(x=x_enc, y="Base:Q", y2="Porcentaje:Q", color=color_enc)
+    hguides = guides.encode(x="Inicio:Q", x2="Valor:Q", y=y_enc, color=color_enc)
+    points = alt.Chart(marks).mark_point(filled=True, size=60, opacity=1).encode(
+        x=x_enc, y=y_enc, color=color_enc, tooltip=["Cuartil:N", "Valor:Q"]
+    )
+    return alt.layer(line, vguides, hguides, points).properties(title=title, height=400)
 
 
 def render_streamlit_app():
@@ -88,7 +212,9 @@ def render_streamlit_app():
         "Lee datos de Google Sheets o, si falla, genera datos simulados para graficar percentiles, distribuciones y tabla de frecuencias."
     )
 
-    with st.sidebar:
+    # Los controles van en un formulario: arrastrar un slider no provoca reruns,
+    # los cambios se aplican juntos al pulsar "Actualizar"
+    with st.sidebar.form("params"):
         st.header("Parámetros")
         bins = st.slider(
             "Número de clases (bins)", min_value=5, max_value=30, value=12, step=1
@@ -98,61 +224,30 @@ def render_streamlit_app():
             "Cantidad de datos simulados", min_value=50, max_value=1000, value=300, step=50
         )
 
-        SHEET_ID = "10qzbSjIYQXPxjjNn9ELzXyDow_bgwSwdWcYlxAFrSuI"
-        data, from_sheet = get_data_from_sheet_or_simulated(SHEET_ID, n=n_datos)
-
-    # Ogiva menor-que
-    x_plot, y_plot, edges, counts = ogive(data, bins=int(bins))
+        st.form_submit_button("Actualizar")
 
-    # Tabla de frecuencias
-    freq_table = frequency_table(data, edges, counts)
+    SHEET_ID = "10qzbSjIYQXPxjjNn9ELzXyDow_bgwSwdWcYlxAFrSuI"
+    data, from_sheet = get_data_from_sheet_or_simulated(SHEET_ID, n=n_datos)
 
-    # Ogiva mayor-que
-    x_gt, y_gt = ogive_inverse(counts, edges)
+    # Ogivas, tabla de frecuencias y percentiles (en caché por datos y bins)
+    x_plot, y_plot, freq_table, quartiles, top_quartile_cut = ogive_summary(data, bins=int(bins))
 
-    # Percentiles
-    p25, p50, p75 = np.percentile(data, [25, 50, 75])
-    top_quartile_cut = interp_value_at(75, x_plot, y_plot)
-
-    # Gráfica
-    fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(12, 5), sharey=True, sharex=True)
-
-    ax1.plot(x_plot, y_plot, "-o", lw=2, ms=4, color="#1f77b4", label="Ogiva (menor-que)")
-    ax1.set_title("Ogiva (menor-que)")
-    ax1.set_xlabel("Valor")
-    ax1.set_ylabel("Frecuencia acumulada (%)")
-    ax1.grid(alpha=0.2)
-
-    # Marcar cuartiles en la ogiva menor-que
-    for p, y_val, color, label in zip([p25, p50, p75], [25, 50, 75], ["red", "green", "purple"], ["Q1", "Q2", "Q3"]):
-        ax1.axvline(x=p, ymax=y_val / 100, color=color, linestyle="--", alpha=0.7)
-        ax1.axhline(y=y_val, xmax=p / ax1.get_xlim()[1], color=color, linestyle="--", alpha=0.7)
-        ax1.plot(p, y_val, 'o', color=color, label=f'{label} ({p:.1f})')
-
-    ax1.legend(loc="lower right")
-
-    ax2.plot(x_gt, y_gt, "-o", lw=2, ms=4, color="#ff7f0e", label="Ogiva inversa (mayor-que)")
-    ax2.set_title("Ogiva inversa (mayor-que)")
-    ax2.set_xlabel("Valor")
-    ax2.grid(alpha=0.2)
-
-    # Marcar cuartiles en la ogiva mayor-que
-    for p, y_val, color, label in zip([p25, p50, p75], [75, 50, 25], ["red", "green", "purple"], ["Q1", "Q2", "Q3"]):
-        ax2.axvline(x=p, ymax=y_val / 100, color=color, linestyle="--", alpha=0.7)
-        ax2.axhline(y=y_val, xmax=p / ax2.get_xlim()[1], color=color, linestyle="--", alpha=0.7)
-        ax2.plot(p, y_val, 'o', color=color, label=f'{label} ({p:.1f})')
-
-    ax2.legend(loc="upper right")
-
-    plt.tight_layout()
-    st.pyplot(fig, width="stretch")
+    # Gráficas (se dibujan en el navegador)
+    x_gt, y_gt = ogive_inverse(x_plot, y_plot)
+    col1, col2 = st.columns(2)
+    col1.altair_chart(
+        ogive_chart(x_plot, y_plot, quartiles, [25, 50, 75], "Ogiva (menor-que)", "#1f77b4", "bottom-right"),
+        width="stretch",
+    )
+    col2.altair_chart(
+        ogive_chart(x_gt, y_gt, quartiles, [75, 50, 25], "Ogiva inversa (mayor-que)", "#ff7f0e", "top-right"),
+        width="stretch",
+    )
 
     # Resumen
     st.subheader("Resumen")
-    c1, c2, c3 = st.columns(3)
-    c1.metric("Q1 (25%)", f"{p25:.2f}")
-    c2.metric("Mediana (50%)", f"{p50:.2f}")
-    c3.metric("Q3 (75%)", f"{p75:.2f}")
+    for col, label, q in zip(st.columns(3), ["Q1 (25%)", "Mediana (50%)", "Q3 (75%)"], quartiles):
+        col.metric(label, f"{q:.2f}")
 
     if from_sheet:
         st.success("Datos cargados desde Google Sheets ✅")